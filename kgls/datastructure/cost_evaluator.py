@@ -1,65 +1,55 @@
-import heapq
-from collections import defaultdict
 from itertools import cycle
 import math
 from typing import Any
 
+import numpy as np
+
 from .node import Node
 from .edge import Edge
 from .route import Route
 from .vrp_solution import VRPSolution
 
 
-class MaxHeapWithUpdate:
-    def __init__(self, elements: list[Edge]):
-        # Create a max-heap by inverting values (negate them)
-        self.heap = elements
-        heapq.heapify(self.heap)
-
-    def get_max_element(self):
-        # Pop the max element (the root of the heap)
-        return heapq.heappop(self.heap)  # Removes the largest (smallest negative)
-
-    def insert_element(self, element: Edge):
-        # Add the new value (inverted for max-heap)
-        heapq.heappush(self.heap, element)
-
-    def get_sorted_list(self):
-        # To get a sorted list, we retrieve and negate all elements
-        return sorted([elem for elem in self.heap])
-
-
 class CostEvaluator:
 
     def __init__(self, nodes: list[Node], capacity: int, run_parameters: dict[str, Any]):
         self._penalization_enabled: bool = False
-        self._edge_penalties: dict[Edge, int] = defaultdict(int)
         self._baseline_cost: float = 0.0
-        self._edge_ranking: MaxHeapWithUpdate = None
+        self._ranked_edges: list[Edge] = []
+        self._edge_values: np.ndarray = None
         self.neighborhood_size = run_parameters['neighborhood_size']
         self._capacity = capacity
 
-        # compute costs as euclidean distance between each pair of nodes
-        self._costs = dict()
-        for node1 in nodes:
-            self._costs[node1.node_id] = dict()
-            for node2 in nodes:
-                self._costs[node1.node_id][node2.node_id] = self._compute_euclidean_distance(node1, node2)
+        # compute costs as euclidean distance between each pair of nodes,
+        # stored as a dense matrix indexed by node_id
+        matrix_size = max(node.node_id for node in nodes) + 1
+        coordinates = np.zeros((matrix_size, 2), dtype=np.float64)
+        for node in nodes:
+            coordinates[node.node_id] = (node.x_coordinate, node.y_coordinate)
+        # use ||a-b||^2 = ||a||^2 + ||b||^2 - 2*a.b, which avoids the big
+        # (N,N,2) intermediate of the broadcast form and runs on a BLAS matmul
+        squared_norms = np.einsum('ij,ij->i', coordinates, coordinates)
+        squared_distances = np.maximum(
+            squared_norms[:, None] + squared_norms[None, :] - 2.0 * (coordinates @ coordinates.T),
+            0.0
+        )
+        self._costs_arr = np.rint(np.sqrt(squared_distances)).astype(np.int32)
+
+        # the penalized costs are only materialized once penalization is first enabled
+        self._penalized_costs_arr = None
+
+        # symmetric penalty counts per edge, indexed by the node ids
+        self._edge_penalties_arr = np.zeros((matrix_size, matrix_size), dtype=np.int16)
 
-        # initialize penalized as euclidean costs
-        self._penalized_costs = dict()
-        for node1 in nodes:
-            self._penalized_costs[node1.node_id] = dict()
-            for node2 in nodes:
-                self._penalized_costs[node1.node_id][node2.node_id] = self._costs[node1.node_id][node2.node_id]
+        # the non-depot nodes are needed in several places, so filter them once
+        self._customers = [node for node in nodes if not node.is_depot]
 
         # get neighborhood for each node
-        self._neighborhood = self._compute_neighborhood(nodes)
+        self._neighborhood = self._compute_neighborhood()
 
         self._baseline_cost = int(sum(
             self.get_distance(node, other)
-            for node in nodes
-            if not node.is_depot
+            for node in self._customers
             for other in self._neighborhood[node]
         ) / (self.neighborhood_size * len(nodes)))
 
@@ -68,39 +58,51 @@ class CostEvaluator:
 
     @staticmethod
     def _compute_euclidean_distance(node1: Node, node2: Node) -> int:
-        return round(
-            math.sqrt(
-                math.pow(node1.x_coordinate - node2.x_coordinate, 2) +
-                math.pow(node1.y_coordinate - node2.y_coordinate, 2)
-            )
-        )
+        # plain multiplications round-trip much faster than math.pow/math.sqrt here
+        delta_x = node1.x_coordinate - node2.x_coordinate
+        delta_y = node1.y_coordinate - node2.y_coordinate
+        return int((delta_x * delta_x + delta_y * delta_y) ** 0.5 + 0.5)
 
     def get_neighborhood(self, node: Node) -> list[Node]:
         return self._neighborhood[node]
 
-    def _compute_neighborhood(self, nodes: list[Node]) -> list[Node]:
-        neighborhood = {
-            node: self._get_nearest_neighbors(node, nodes)
-            for node in nodes
-            if not node.is_depot
-        }
+    def get_neighborhood_ids(self) -> tuple[np.ndarray, np.ndarray]:
+        # neighborhoods as a flat (num_nodes, neighborhood_size) id table
+        # plus the number of valid entries per row
+        return self._neighborhood_ids, self._num_neighbors
+
+    def _compute_neighborhood(self) -> dict[Node, list[Node]]:
+        customers = self._customers
+        customer_ids = np.array([node.node_id for node in customers], dtype=np.intp)
+
+        # select only the nearest nodes via partitioning instead of sorting all nodes;
+        # one extra entry is taken since each customer is itself among the candidates
+        num_nearest = min(self.neighborhood_size + 1, len(customers))
+
+        neighborhood = {}
+        for node in customers:
+            distances = self._costs_arr[node.node_id, customer_ids]
+            if num_nearest < len(customers):
+                nearest = np.argpartition(distances, num_nearest - 1)[:num_nearest]
+            else:
+                nearest = np.arange(len(customers))
+            nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+
+            neighborhood[node] = [
+                customers[index] for index in nearest if customers[index] != node
+            ][:self.neighborhood_size]
+
+        # flatten the neighborhoods into an id table for array-based consumers
+        matrix_size = self._costs_arr.shape[0]
+        self._neighborhood_ids = np.zeros((matrix_size, self.neighborhood_size), dtype=np.int64)
+        self._num_neighbors = np.zeros(matrix_size, dtype=np.int64)
+        for node, neighbors in neighborhood.items():
+            self._num_neighbors[node.node_id] = len(neighbors)
+            for slot, neighbor in enumerate(neighbors):
+                self._neighborhood_ids[node.node_id, slot] = neighbor.node_id
 
         return neighborhood
 
-    def _get_nearest_neighbors(self, node: Node, nodes: list[Node]) -> list[Node]:
-        # Sort nodes by their Euclidean distance to the given node, ascending
-        sorted_nodes = sorted(
-            nodes,
-            key=lambda x: self._compute_euclidean_distance(x, node)
-        )
-
-        # Filter out the depot and the node itself
-        nearest_neighbors = [
-            n for n in sorted_nodes if not n.is_depot and n != node
-        ]
-
-        return nearest_neighbors[:self.neighborhood_size]
-
     def is_feasible(self, capacity: int) -> bool:
         return capacity <= self._capacity
 
@@ -108,92 +110,154 @@ class CostEvaluator:
         edges_in_solution: list[Edge] = []
 
         criterium_functions = {
-            "length": self._compute_edge_length_value,
-            "width": self._compute_edge_width_value,
-            "width_length": self._compute_edge_width_length_value
+            "length": self._compute_edge_length_values,
+            "width": self._compute_edge_width_values,
+            "width_length": self._compute_edge_width_length_values
         }
         # Get the computation function based on the current penalization criterium
-        compute_edge_value = criterium_functions[self._penalization_criterium]
+        compute_edge_values = criterium_functions[self._penalization_criterium]
 
         for route in routes:
-            center_x, center_y = (None, None)
-            if self._penalization_criterium in {"width", "width_length"}:
-                center_x, center_y = self._compute_route_center(route.nodes)
-
-            for edge in route.edges:
-                # Compute the value for the edge
-                edge.value = compute_edge_value(edge, center_x, center_y, route)
-                edge.value /= (1 + self._edge_penalties[edge])
+            # Compute the values of all edges of the route in one pass,
+            # discounted by their accumulated penalties
+            edge_values = compute_edge_values(route)
+            node_ids = np.fromiter(
+                (node.node_id for node in route._nodes),
+                dtype=np.intp,
+                count=len(route._nodes)
+            )
+            edge_values = edge_values / (1 + self._edge_penalties_arr[node_ids[:-1], node_ids[1:]])
+
+            for edge, value in zip(route.edges, edge_values):
+                edge.value = value
                 edges_in_solution.append(edge)
 
-        # Update edge ranking
-        self._edge_ranking = MaxHeapWithUpdate(edges_in_solution)
+        # Update edge ranking; the worst edges are popped via argmax,
+        # which is cheaper than keeping a heap since only a handful of
+        # edges are penalized between two rankings
+        self._ranked_edges = edges_in_solution
+        self._edge_values = np.array(
+            [edge.value for edge in edges_in_solution], dtype=np.float64
+        )
 
         # Rotate to next penalization criterium
         self._penalization_criterium = next(self._penalization_criterium_options)
 
-    def _compute_edge_length_value(self, edge: Edge, *args) -> float:
-        return self._costs[edge.nodes[0].node_id][edge.nodes[1].node_id]
+    def _compute_edge_length_values(self, route: Route) -> np.ndarray:
+        node_ids = np.fromiter(
+            (node.node_id for node in route._nodes),
+            dtype=np.intp,
+            count=len(route._nodes)
+        )
+        return self._costs_arr[node_ids[:-1], node_ids[1:]]
+
+    def _compute_edge_width_values(self, route: Route) -> np.ndarray:
+        # vectorized variant of _compute_edge_width over all edges of the route:
+        # the width of an edge is the difference of the signed distances of its
+        # nodes to the line through depot and route center
+        depot = route.depot
+        center_x, center_y = route.center
+
+        distance_depot_center = math.sqrt(
+            math.pow(depot.x_coordinate - center_x, 2) +
+            math.pow(depot.y_coordinate - center_y, 2)
+        )
+        if distance_depot_center == 0:
+            return np.zeros(len(route._nodes) - 1)
 
-    def _compute_edge_width_value(self, edge: Edge, center_x: float, center_y: float, route: Route) -> float:
-        return self._compute_edge_width(edge, center_x, center_y, route.depot)
+        x_coordinates = np.fromiter(
+            (node.x_coordinate for node in route._nodes),
+            dtype=np.float64,
+            count=len(route._nodes)
+        )
+        y_coordinates = np.fromiter(
+            (node.y_coordinate for node in route._nodes),
+            dtype=np.float64,
+            count=len(route._nodes)
+        )
+        signed_distances = (
+                (center_y - depot.y_coordinate) * x_coordinates
+                - (center_x - depot.x_coordinate) * y_coordinates
+                + (center_x * depot.y_coordinate) - (center_y * depot.x_coordinate)
+        ) / distance_depot_center
 
-    def _compute_edge_width_length_value(self, edge: Edge, center_x: float, center_y: float, route: Route) -> float:
-        width_value = self._compute_edge_width(edge, center_x, center_y, route.depot)
-        length_value = self._costs[edge.nodes[0].node_id][edge.nodes[1].node_id]
-        return width_value + length_value
+        return np.abs(signed_distances[1:] - signed_distances[:-1])
+
+    def _compute_edge_width_length_values(self, route: Route) -> np.ndarray:
+        return self._compute_edge_width_values(route) + self._compute_edge_length_values(route)
 
     def enable_penalization(self):
+        if self._penalized_costs_arr is None:
+            # initialize penalized as euclidean costs
+            self._penalized_costs_arr = self._costs_arr.copy()
         self._penalization_enabled = True
 
     def disable_penalization(self):
         self._penalization_enabled = False
 
+    def get_distance_matrix(self) -> np.ndarray:
+        # the matrix which get_distance currently reads from
+        if not self._penalization_enabled:
+            return self._costs_arr
+        else:
+            return self._penalized_costs_arr
+
     def get_distance(self, node1: Node, node2: Node) -> int:
         if not self._penalization_enabled:
-            return self._costs[node1.node_id][node2.node_id]  # node1.get_distance(node2)
+            return self._costs_arr[node1.node_id, node2.node_id]
         else:
-            return self._penalized_costs[node1.node_id][node2.node_id] # node1.get_distance(node2) + 0.1 * self._baseline_cost * self._edge_penalties[Edge(node1, node2)]
+            return self._penalized_costs_arr[node1.node_id, node2.node_id]
 
     def get_and_penalize_worst_edge(self) -> Edge:
-        worst_edge = self._edge_ranking.get_max_element()
-        self._edge_penalties[worst_edge] += 1
+        if self._penalized_costs_arr is None:
+            self._penalized_costs_arr = self._costs_arr.copy()
+
+        worst_index = int(np.argmax(self._edge_values))
+        worst_edge = self._ranked_edges[worst_index]
 
-        # update costs
         node1 = worst_edge.nodes[0].node_id
         node2 = worst_edge.nodes[1].node_id
+        edge_penalty = self._edge_penalties_arr[node1, node2] + 1
+        self._edge_penalties_arr[node1, node2] = self._edge_penalties_arr[node2, node1] = edge_penalty
+
+        # update costs
         penalization_costs = round(
-                self._costs[node1][node2]
-                + 0.1 * self._baseline_cost * self._edge_penalties[worst_edge]
+                self._costs_arr[node1, node2]
+                + 0.1 * self._baseline_cost * edge_penalty
         )
-        self._penalized_costs[node1][node2] = penalization_costs
-        self._penalized_costs[node2][node1] = penalization_costs
+        self._penalized_costs_arr[node1, node2] = self._penalized_costs_arr[node2, node1] = penalization_costs
 
         # update (reduce) 'badness' of the just penalized edge (to avoid penalizing it again too soon)
         worst_edge.value = (
-                self._costs[node1][node2]/
-                (1 + self._edge_penalties[worst_edge])
+                self._costs_arr[node1, node2] /
+                (1 + edge_penalty)
         )
-        self._edge_ranking.insert_element(worst_edge)
+        self._edge_values[worst_index] = worst_edge.value
 
         return worst_edge
 
     def penalize(self, edge: Edge) -> None:
-        self._edge_penalties[edge] += 1
+        node1 = edge.nodes[0].node_id
+        node2 = edge.nodes[1].node_id
+        self._edge_penalties_arr[node1, node2] += 1
+        self._edge_penalties_arr[node2, node1] = self._edge_penalties_arr[node1, node2]
 
     def get_solution_costs(self, solution: VRPSolution, ignore_penalties: bool = False) -> int:
+        if ignore_penalties:
+            costs_matrix = self._costs_arr
+        else:
+            costs_matrix = self.get_distance_matrix()
+
         solution_costs: int = 0
 
         for route in solution.routes:
             if route.size > 0:
-                for idx in range(len(route._nodes) - 1):
-                    edge_node1 = route._nodes[idx]
-                    edge_node2 = route._nodes[idx + 1]
-
-                    if ignore_penalties:
-                        solution_costs += self._costs[edge_node1.node_id][edge_node2.node_id]
-                    else:
-                        solution_costs += self.get_distance(edge_node1, edge_node2)
+                node_order = np.fromiter(
+                    (node.node_id for node in route._nodes),
+                    dtype=np.intp,
+                    count=len(route._nodes)
+                )
+                solution_costs += int(costs_matrix[node_order[:-1], node_order[1:]].sum())
 
         return solution_costs
 
@@ -18,6 +18,11 @@ class Route:
         self.size = len(nodes) - 2  # Number of customers (not including depot)
         self.volume = sum(node.demand for node in self._nodes)  # Sum of demand of all customers of the route
 
+        # running coordinate sums over the customers plus one depot visit,
+        # so the route center is available without re-summing all nodes
+        self._center_x_sum = sum(node.x_coordinate for node in self._nodes[1:])
+        self._center_y_sum = sum(node.y_coordinate for node in self._nodes[1:])
+
         self.validate()
 
     def __repr__(self):
@@ -34,6 +39,8 @@ class Route:
         assert node in self._nodes, 'Node does not exist in route'
         self.size -= 1
         self.volume -= node.demand
+        self._center_x_sum -= node.x_coordinate
+        self._center_y_sum -= node.y_coordinate
         self._nodes.remove(node)
 
     def add_customers_after(self, nodes_to_add: list[Node], insert_after: Node):
@@ -47,6 +54,13 @@ class Route:
             assert node.is_depot is False, 'A depot is inserted into a route'
             self.size += 1
             self.volume += node.demand
+            self._center_x_sum += node.x_coordinate
+            self._center_y_sum += node.y_coordinate
+
+    @property
+    def center(self) -> tuple[float, float]:
+        num_nodes = self.size + 1
+        return self._center_x_sum / num_nodes, self._center_y_sum / num_nodes
 
     @property
     def customers(self) -> list[Node]:
@@ -1,5 +1,7 @@
 from collections import defaultdict
 
+import numpy as np
+
 from .node import Node
 from .route import Route
 from .vrp_problem import VRPProblem
@@ -28,6 +30,13 @@ class VRPSolution:
             for node in self.problem.customers
         }
 
+        # array mirrors of route volumes and route membership, kept in sync
+        # with the linked-list representation for array-based consumers
+        self.route_volumes = np.zeros(len(self.problem.customers) + 1, dtype=np.int64)
+        self.node_route_index = np.full(
+            max(node.node_id for node in self.problem.nodes) + 1, -1, dtype=np.int64
+        )
+
     def start_plotting(self):
         self._plot_progress = True
 
@@ -69,8 +78,10 @@ class VRPSolution:
         for route in self.routes:
             assert route.volume <= self.problem.capacity, \
                 "Capacity violation"
+            assert self.route_volumes[route.route_index] == route.volume
             for node in route.customers:
                 assert self._route[node.node_id] == route
+                assert self.node_route_index[node.node_id] == route.route_index
 
         # check that nodes are linked correctly
         for route in self.routes:
@@ -127,8 +138,11 @@ class VRPSolution:
 
         for node in nodes_to_be_removed:
             self._route[node.node_id] = None
+            self.node_route_index[node.node_id] = -1
             route.remove_customer(node)
 
+        self.route_volumes[route.route_index] = route.volume
+
     def add_route(self, nodes: list[Node]):
         new_depot = self.problem.depot
         route_nodes = [new_depot] + nodes + [new_depot]
@@ -138,11 +152,18 @@ class VRPSolution:
 
         self._next_route_index += 1
 
+        if self._next_route_index > len(self.route_volumes):
+            self.route_volumes = np.concatenate(
+                [self.route_volumes, np.zeros(len(self.route_volumes), dtype=np.int64)]
+            )
+        self.route_volumes[new_route.route_index] = new_route.volume
+
         for idx, node in enumerate(route_nodes):
             if not node.is_depot:
                 self._prev[node.node_id] = route_nodes[idx - 1]
                 self._next[node.node_id] = route_nodes[idx + 1]
                 self._route[node.node_id] = new_route
+                self.node_route_index[node.node_id] = new_route.route_index
 
     def insert_nodes_after(self, nodes_to_be_inserted: list[Node], move_after_node: Node, route: Route):
         # re-link the nodes to be inserted, since they might have been rotated
@@ -151,6 +172,7 @@ class VRPSolution:
                 self._next[node.node_id] = nodes_to_be_inserted[index + 1]
                 self._prev[nodes_to_be_inserted[index + 1].node_id] = node
             self._route[node.node_id] = route
+            self.node_route_index[node.node_id] = route.route_index
 
         # add links between new nodes and connecting nodes in route
         if move_after_node.is_depot:
@@ -164,6 +186,7 @@ class VRPSolution:
         self._prev[old_next_node.node_id] = nodes_to_be_inserted[-1]
 
         route.add_customers_after(nodes_to_be_inserted, move_after_node)
+        self.route_volumes[route.route_index] = route.volume
 
     def rearrage_route(self, route: Route, node_order: list[Node]):
         assert node_order[0].is_depot
@@ -126,6 +126,7 @@ def search_3_opt_moves(
             search_3_opt_moves_from(solution, cost_evaluator, start_node)
         )
 
-    return sorted(candidate_moves)
+    candidate_moves.sort(key=lambda move: -move.improvement)
+    return candidate_moves
 
 
@@ -1,5 +1,12 @@
 import logging
 
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
 from kgls.datastructure import Node, Route, VRPSolution, CostEvaluator
 from .local_search_move import LocalSearchMove
 
@@ -7,49 +14,128 @@ logger = logging.getLogger(__name__)
 
 
 class CrossExchange(LocalSearchMove):
+    # a move is recorded only by its endpoints (start nodes, lengths and
+    # directions of both segments); the segment node lists are materialized
+    # lazily since most candidate moves are never executed
 
     def __init__(
             self,
-            segment1: list[Node],
-            segment2: list[Node],
-            segment1_insert_after: Node,
-            segment2_insert_after: Node,
+            solution: VRPSolution,
+            start_node: Node,
+            segment1_length: int,
+            segment1_direction: int,
+            segment2_length: int,
+            segment2_direction: int,
+            route2_segment_connection_start: Node,
             route1: Route,
             route2: Route,
-            improvement: float,
-            start_node: Node
+            improvement: float
     ):
-        self.segment1 = segment1
-        self.segment2 = segment2
-        self.segment1_insert_after = segment1_insert_after
-        self.segment2_insert_after = segment2_insert_after
         self.start_node = start_node
         self.route1 = route1
         self.route2 = route2
+        self.route_mask = (1 << route1.route_index) | (1 << route2.route_index)
 
         self.improvement = improvement
 
-    def get_routes(self) -> list[Route]:
-        return set([self.route1, self.route2])
+        self._solution = solution
+        self._segment1_length = segment1_length
+        self._segment1_direction = segment1_direction
+        self._segment2_length = segment2_length
+        self._segment2_direction = segment2_direction
+        self._route2_segment_connection_start = route2_segment_connection_start
+
+        # the segment lists are in the order as the nodes are later inserted,
+        # which is the reverse of the extension order for some direction combinations
+        self._reverse_segment1 = (
+            (segment1_direction == 1 and segment2_direction == 0)
+            or (segment1_direction + segment2_direction == 0)
+        )
+        self._reverse_segment2 = (
+            (segment2_direction == 1 and segment1_direction == 0)
+            or (segment1_direction + segment2_direction == 0)
+        )
 
-    def is_disjunct(self, other):
-        if self.route1 in other.get_routes():
-            return False
-        if self.route2 in other.get_routes():
-            return False
+        self._segment1: list[Node] = None
+        self._segment2: list[Node] = None
 
-        return True
+    def _materialize_segment(
+            self,
+            segment_start: Node,
+            length: int,
+            direction: int,
+            reverse: bool
+    ) -> list[Node]:
+        segment = [segment_start]
+        while len(segment) < length:
+            segment.append(self._solution.neighbour(segment[-1], direction))
+        if reverse:
+            segment.reverse()
+        return segment
+
+    @property
+    def segment1(self) -> list[Node]:
+        if self._segment1 is None:
+            self._segment1 = self._materialize_segment(
+                self.start_node,
+                self._segment1_length,
+                self._segment1_direction,
+                self._reverse_segment1
+            )
+        return self._segment1
+
+    @property
+    def segment2(self) -> list[Node]:
+        if self._segment2 is None:
+            self._segment2 = self._materialize_segment(
+                self._solution.neighbour(self._route2_segment_connection_start, self._segment2_direction),
+                self._segment2_length,
+                self._segment2_direction,
+                self._reverse_segment2
+            )
+        return self._segment2
+
+    @property
+    def segment1_insert_after(self) -> Node:
+        if self._segment2_direction == 1:
+            return self._route2_segment_connection_start
+
+        segment2 = self.segment2
+        segment2_walk_end = segment2[0] if self._reverse_segment2 else segment2[-1]
+        return self._solution.neighbour(segment2_walk_end, self._segment2_direction)
+
+    @property
+    def segment2_insert_after(self) -> Node:
+        if self._segment1_direction == 1:
+            return self._solution.neighbour(self.start_node, 1 - self._segment1_direction)
+
+        segment1 = self.segment1
+        segment1_walk_end = segment1[0] if self._reverse_segment1 else segment1[-1]
+        return self._solution.neighbour(segment1_walk_end, self._segment1_direction)
+
+    def get_routes(self) -> tuple[Route, Route]:
+        return self.route1, self.route2
+
+    def is_disjunct(self, other):
+        return (self.route_mask & other.route_mask) == 0
 
     def execute(self, solution: VRPSolution):
+        # materialize the segments and insertion positions before the
+        # solution links are modified
+        segment1 = self.segment1
+        segment2 = self.segment2
+        segment1_insert_after = self.segment1_insert_after
+        segment2_insert_after = self.segment2_insert_after
+
         logger.debug(f'Executing cross-exchange with segments of sizes '
-                     f'{len(self.segment1)} and {len(self.segment2)} '
+                     f'{len(segment1)} and {len(segment2)} '
                      f'with improvement of {int(self.improvement)}')
 
-        solution.remove_nodes(self.segment1)
-        solution.remove_nodes(self.segment2)
+        solution.remove_nodes(segment1)
+        solution.remove_nodes(segment2)
 
-        solution.insert_nodes_after(self.segment1, self.segment1_insert_after, self.route2)
-        solution.insert_nodes_after(self.segment2, self.segment2_insert_after, self.route1)
+        solution.insert_nodes_after(segment1, segment1_insert_after, self.route2)
+        solution.insert_nodes_after(segment2, segment2_insert_after, self.route1)
 
 
 def search_cross_exchanges_from(
@@ -64,14 +150,14 @@ def search_cross_exchanges_from(
     route1: Route = solution.route_of(start_node)
     candidate_moves: list[CrossExchange] = []
 
+    # bind the active matrix once so the hot loop skips the per-call
+    # method dispatch and penalization branch of get_distance
+    costs_matrix = cost_evaluator.get_distance_matrix()
+
     for segment1_direction in segment1_directions:
         for segment2_direction in segment2_directions:
 
             route1_segment_connection_start = solution.neighbour(start_node, 1 - segment1_direction)
-            #if segment1_direction == 1:
-                #route1_segment_connection_start = start_node.prev
-            #else:
-                #route1_segment_connection_start = start_node.next
 
             for route2_segment_connection_start in cost_evaluator.get_neighborhood(start_node):
                 route2 = solution.route_of(route2_segment_connection_start)
@@ -86,22 +172,22 @@ def search_cross_exchanges_from(
 
                     # current edges - new edges
                     improvement_first_cross = (
-                            cost_evaluator.get_distance(start_node, route1_segment_connection_start)
-                            + cost_evaluator.get_distance(segment2_start, route2_segment_connection_start)
-                            - cost_evaluator.get_distance(start_node, route2_segment_connection_start)
-                            - cost_evaluator.get_distance(segment2_start, route1_segment_connection_start)
+                            costs_matrix[start_node.node_id, route1_segment_connection_start.node_id]
+                            + costs_matrix[segment2_start.node_id, route2_segment_connection_start.node_id]
+                            - costs_matrix[start_node.node_id, route2_segment_connection_start.node_id]
+                            - costs_matrix[segment2_start.node_id, route1_segment_connection_start.node_id]
                     )
 
                     if improvement_first_cross > 0:
                         segment1_end = start_node
-                        segment1_list = [segment1_end]
+                        segment1_length = 1
                         segment1_volume = segment1_end.demand
 
                         # try to extend segment 1 until the end
                         while not segment1_end.is_depot:
                             # extend segment2 until capacity of route 1 is violated
                             segment2_end = segment2_start
-                            segment2_list = [segment2_end]
+                            segment2_length = 1
                             segment2_volume = segment2_end.demand
 
                             while (not segment2_end.is_depot and
@@ -116,10 +202,10 @@ def search_cross_exchanges_from(
                                     route2_segment_connection_end = solution.neighbour(segment2_end, segment2_direction)
 
                                     improvement_second_cross = (
-                                        cost_evaluator.get_distance(segment1_end, route1_segment_connection_end)
-                                        + cost_evaluator.get_distance(segment2_end, route2_segment_connection_end)
-                                        - cost_evaluator.get_distance(segment1_end, route2_segment_connection_end)
-                                        - cost_evaluator.get_distance(segment2_end, route1_segment_connection_end)
+                                        costs_matrix[segment1_end.node_id, route1_segment_connection_end.node_id]
+                                        + costs_matrix[segment2_end.node_id, route2_segment_connection_end.node_id]
+                                        - costs_matrix[segment1_end.node_id, route2_segment_connection_end.node_id]
+                                        - costs_matrix[segment2_end.node_id, route1_segment_connection_end.node_id]
                                     )
                                     improvement = improvement_first_cross + improvement_second_cross
 
@@ -127,50 +213,268 @@ def search_cross_exchanges_from(
                                         # store move
                                         candidate_moves.append(
                                             CrossExchange(
-                                                segment1=segment1_list.copy(),
-                                                segment2=segment2_list.copy(),
+                                                solution=solution,
+                                                start_node=start_node,
+                                                segment1_length=segment1_length,
+                                                segment1_direction=segment1_direction,
+                                                segment2_length=segment2_length,
+                                                segment2_direction=segment2_direction,
+                                                route2_segment_connection_start=route2_segment_connection_start,
                                                 route1=route1,
                                                 route2=route2,
-                                                segment1_insert_after=route2_segment_connection_start if segment2_direction == 1 else route2_segment_connection_end,
-                                                segment2_insert_after=route1_segment_connection_start if segment1_direction == 1 else route1_segment_connection_end,
-                                                improvement=improvement,
-                                                start_node=start_node
+                                                improvement=improvement
                                             )
                                         )
 
                                 # extend segment2
-                                # segment lists are in the order as the nodes are later inserted
-                                # segment2_end = segment2_end.get_neighbour(segment2_direction)
                                 segment2_end = solution.neighbour(segment2_end, segment2_direction)
-
-                                if (segment2_direction == 1 and segment1_direction == 0) or (segment1_direction + segment2_direction == 0):
-                                    segment2_list.insert(0, segment2_end)
-                                else:
-                                    segment2_list.append(segment2_end)
+                                segment2_length += 1
                                 segment2_volume += segment2_end.demand
 
                             # extend segment1
-                            # segment1_end = segment1_end.get_neighbour(segment1_direction)
                             segment1_end = solution.neighbour(segment1_end, segment1_direction)
-                            if (segment1_direction == 1 and segment2_direction == 0) or (segment1_direction + segment2_direction == 0):
-                                segment1_list.insert(0, segment1_end)
-                            else:
-                                segment1_list.append(segment1_end)
-
+                            segment1_length += 1
                             segment1_volume += segment1_end.demand
 
     return candidate_moves
 
 
+if njit is not None:
+
+    @njit(cache=True, boundscheck=False)
+    def _search_cx_kernel(
+            start_id, directions1, directions2, dist, next_arr, prev_arr,
+            route_arr, route_volumes, neighbors, num_neighbors, demands,
+            capacity, depot_id
+    ):
+        # array-based mirror of search_cross_exchanges_from; each found move is
+        # encoded as (improvement, segment1_direction, segment2_direction,
+        # route2_segment_connection_start, segment1_length, segment2_length)
+        max_moves = 64
+        moves = np.empty((max_moves, 6), dtype=np.int64)
+        num_moves = 0
+
+        route1 = route_arr[start_id]
+        route1_volume = route_volumes[route1]
+
+        for segment1_direction in directions1:
+            if segment1_direction == 1:
+                route1_connection_start = prev_arr[start_id]
+            else:
+                route1_connection_start = next_arr[start_id]
+
+            for segment2_direction in directions2:
+                for index in range(num_neighbors[start_id]):
+                    route2_connection_start = neighbors[start_id, index]
+                    route2 = route_arr[route2_connection_start]
+                    if route2 == route1:
+                        continue
+
+                    if segment2_direction == 1:
+                        segment2_start = next_arr[route2_connection_start]
+                    else:
+                        segment2_start = prev_arr[route2_connection_start]
+                    if segment2_start == depot_id:
+                        continue
+
+                    # current edges - new edges
+                    improvement_first_cross = (
+                        dist[start_id, route1_connection_start]
+                        + dist[segment2_start, route2_connection_start]
+                        - dist[start_id, route2_connection_start]
+                        - dist[segment2_start, route1_connection_start]
+                    )
+                    if improvement_first_cross <= 0:
+                        continue
+
+                    route2_volume = route_volumes[route2]
+                    segment1_end = start_id
+                    segment1_length = 1
+                    segment1_volume = demands[start_id]
+
+                    # try to extend segment 1 until the end
+                    while segment1_end != depot_id:
+                        # extend segment2 until capacity of route 1 is violated
+                        segment2_end = segment2_start
+                        segment2_length = 1
+                        segment2_volume = demands[segment2_start]
+
+                        while (segment2_end != depot_id and
+                               route1_volume - segment1_volume + segment2_volume <= capacity):
+
+                            # check feasibility of route 2
+                            if route2_volume - segment2_volume + segment1_volume <= capacity:
+                                # check overall improvement of move
+                                if segment1_direction == 1:
+                                    route1_connection_end = next_arr[segment1_end]
+                                else:
+                                    route1_connection_end = prev_arr[segment1_end]
+                                if segment2_direction == 1:
+                                    route2_connection_end = next_arr[segment2_end]
+                                else:
+                                    route2_connection_end = prev_arr[segment2_end]
+
+                                improvement_second_cross = (
+                                    dist[segment1_end, route1_connection_end]
+                                    + dist[segment2_end, route2_connection_end]
+                                    - dist[segment1_end, route2_connection_end]
+                                    - dist[segment2_end, route1_connection_end]
+                                )
+                                improvement = improvement_first_cross + improvement_second_cross
+
+                                if improvement > 0:
+                                    # store move
+                                    if num_moves == max_moves:
+                                        grown = np.empty((2 * max_moves, 6), dtype=np.int64)
+                                        grown[:max_moves] = moves
+                                        moves = grown
+                                        max_moves *= 2
+                                    moves[num_moves, 0] = improvement
+                                    moves[num_moves, 1] = segment1_direction
+                                    moves[num_moves, 2] = segment2_direction
+                                    moves[num_moves, 3] = route2_connection_start
+                                    moves[num_moves, 4] = segment1_length
+                                    moves[num_moves, 5] = segment2_length
+                                    num_moves += 1
+
+                            # extend segment2
+                            if segment2_direction == 1:
+                                segment2_end = next_arr[segment2_end]
+                            else:
+                                segment2_end = prev_arr[segment2_end]
+                            segment2_length += 1
+                            segment2_volume += demands[segment2_end]
+
+                        # extend segment1
+                        if segment1_direction == 1:
+                            segment1_end = next_arr[segment1_end]
+                        else:
+                            segment1_end = prev_arr[segment1_end]
+                        segment1_length += 1
+                        segment1_volume += demands[segment1_end]
+
+        return moves[:num_moves]
+
+    # how many encoded moves the parallel kernel can store per start node;
+    # the rare start nodes with more candidates are re-searched serially
+    _MAX_MOVES_PER_START = 128
+
+    @njit(cache=True, parallel=True, boundscheck=False)
+    def _search_cx_kernel_parallel(
+            start_ids, directions1, directions2, dist, next_arr, prev_arr,
+            route_arr, route_volumes, neighbors, num_neighbors, demands,
+            capacity, depot_id, encoded_moves, num_moves
+    ):
+        # the searches from different start nodes are independent and only
+        # read the shared arrays, so they can run in parallel
+        for index in prange(len(start_ids)):
+            moves = _search_cx_kernel(
+                start_ids[index], directions1, directions2, dist, next_arr,
+                prev_arr, route_arr, route_volumes, neighbors, num_neighbors,
+                demands, capacity, depot_id
+            )
+            num_moves[index] = moves.shape[0]
+            limit = min(moves.shape[0], encoded_moves.shape[1])
+            encoded_moves[index, :limit] = moves[:limit]
+
+
+def _build_search_arrays(solution: VRPSolution, cost_evaluator: CostEvaluator) -> tuple:
+    # snapshot the linked-list solution into flat arrays for the kernel
+    dist = cost_evaluator.get_distance_matrix()
+    size = dist.shape[0]
+
+    next_arr = np.full(size, -1, dtype=np.int64)
+    prev_arr = np.full(size, -1, dtype=np.int64)
+    demands = np.zeros(size, dtype=np.int64)
+    neighbors, num_neighbors = cost_evaluator.get_neighborhood_ids()
+
+    for node in solution.problem.nodes:
+        demands[node.node_id] = node.demand
+
+    for node in solution.problem.customers:
+        next_arr[node.node_id] = solution.next(node).node_id
+        prev_arr[node.node_id] = solution.prev(node).node_id
+
+    # route membership and volumes are maintained as arrays by the solution
+    return (dist, next_arr, prev_arr, solution.node_route_index,
+            solution.route_volumes, neighbors, num_neighbors, demands)
+
+
+def _build_moves_from_kernel(
+        solution: VRPSolution,
+        start_node: Node,
+        encoded_moves: np.ndarray,
+        nodes_by_id: dict[int, Node],
+) -> list[CrossExchange]:
+    # build CrossExchange objects for the (few) improving moves found by the kernel
+    moves = []
+    route1 = solution.route_of(start_node)
+
+    for row in encoded_moves:
+        route2_segment_connection_start = nodes_by_id[int(row[3])]
+
+        moves.append(
+            CrossExchange(
+                solution=solution,
+                start_node=start_node,
+                segment1_length=int(row[4]),
+                segment1_direction=int(row[1]),
+                segment2_length=int(row[5]),
+                segment2_direction=int(row[2]),
+                route2_segment_connection_start=route2_segment_connection_start,
+                route1=route1,
+                route2=solution.route_of(route2_segment_connection_start),
+                improvement=int(row[0])
+            )
+        )
+
+    return moves
+
+
 def search_cross_exchanges(
         solution: VRPSolution,
         cost_evaluator: CostEvaluator,
         start_nodes: list[Node],
 ) -> list[CrossExchange]:
     candidate_moves = []
-    for start_node in start_nodes:
-        candidate_moves.extend(
-            search_cross_exchanges_from(solution, cost_evaluator, start_node)
+
+    if njit is not None:
+        search_arrays = _build_search_arrays(solution, cost_evaluator)
+        directions = np.array([0, 1], dtype=np.int64)
+        nodes_by_id = {node.node_id: node for node in solution.problem.nodes}
+        depot_id = solution.problem.depot.node_id
+
+        start_nodes = list(start_nodes)
+        start_ids = np.fromiter(
+            (node.node_id for node in start_nodes), dtype=np.int64, count=len(start_nodes)
         )
+        encoded_moves = np.empty((len(start_nodes), _MAX_MOVES_PER_START, 6), dtype=np.int64)
+        num_moves = np.zeros(len(start_nodes), dtype=np.int64)
 
-    return sorted(candidate_moves)
+        _search_cx_kernel_parallel(
+            start_ids, directions, directions, *search_arrays,
+            cost_evaluator._capacity, depot_id, encoded_moves, num_moves
+        )
+
+        for index, start_node in enumerate(start_nodes):
+            if num_moves[index] > _MAX_MOVES_PER_START:
+                # the per-start buffer overflowed; redo this start node serially
+                node_moves = _search_cx_kernel(
+                    start_ids[index], directions, directions, *search_arrays,
+                    cost_evaluator._capacity, depot_id
+                )
+            else:
+                node_moves = encoded_moves[index, :num_moves[index]]
+            candidate_moves.extend(
+                _build_moves_from_kernel(solution, start_node, node_moves, nodes_by_id)
+            )
+    else:
+        for start_node in start_nodes:
+            candidate_moves.extend(
+                search_cross_exchanges_from(solution, cost_evaluator, start_node)
+            )
+
+    # sort by a precomputed key instead of relying on LocalSearchMove.__lt__,
+    # which would be called as a Python method for every comparison
+    candidate_moves.sort(key=lambda move: -move.improvement)
+    return candidate_moves
@@ -309,7 +309,7 @@ def run_lin_kernighan_heuristic(
 
             if valid_moves:
                 old_costs = cost_evaluator.get_solution_costs(solution)
-                best_move = sorted(valid_moves)[0]
+                best_move = min(valid_moves)
                 best_move.execute(solution)
 
                 # validate changes in solution
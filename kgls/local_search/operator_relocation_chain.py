@@ -1,6 +1,8 @@
 from collections import defaultdict
 import logging
 
+import numpy as np
+
 from kgls.datastructure import Node, Route, Edge, VRPSolution, CostEvaluator
 from .local_search_move import LocalSearchMove
 
@@ -116,34 +118,12 @@ def insert_node(
         node_to_move: Node,
         removal_gain: float,
         insert_next_to: Node,
+        insertion_cost: int,
+        insert_after: Node,
+        insert_before: Node,
         cur_chain: RelocationChain,
         solution: VRPSolution,
-        cost_evaluator: CostEvaluator,
 ):
-    # TODO check insertion before and after
-    #insertion_cost = cost_evaluator.insertion_costs[node_to_move, insert_next_to]
-    #insert_after = cost_evaluator.insertion_after[node_to_move, insert_next_to]
-    predecessor = solution.prev(insert_next_to)
-    successor = solution.next(insert_next_to)
-    insertion_cost_before = (
-            cost_evaluator.get_distance(node_to_move, predecessor)
-            + cost_evaluator.get_distance(node_to_move, insert_next_to)
-            - cost_evaluator.get_distance(predecessor, insert_next_to)
-    )
-    insertion_cost_after = (
-            cost_evaluator.get_distance(node_to_move, successor)
-            + cost_evaluator.get_distance(node_to_move, insert_next_to)
-            - cost_evaluator.get_distance(successor, insert_next_to)
-    )
-    if insertion_cost_before <= insertion_cost_after:
-        insertion_cost = insertion_cost_before
-        insert_after = predecessor
-        insert_before = insert_next_to
-    else:
-        insertion_cost = insertion_cost_after
-        insert_after = insert_next_to
-        insert_before = successor
-
     cost_change = removal_gain - insertion_cost
 
     if cur_chain.improvement + cost_change > 0:
@@ -194,27 +174,66 @@ def search_relocation_chains_from(
     # Step 2: For each candidate neighbour of 'node_to_move',
     # check whether a relocation next to it would improve the solution
     from_route = solution.route_of(node_to_move)
+    neighbours = [
+        neighbour
+        for neighbour in cost_evaluator.get_neighborhood(node_to_move)
+        if solution.route_of(neighbour) != from_route and neighbour not in cur_chain.relocated_nodes
+    ]
+
     candidate_insertions = defaultdict(list)
-    for neighbour in cost_evaluator.get_neighborhood(node_to_move):
-        to_route = solution.route_of(neighbour)
+    if neighbours:
+        # compute the insertion costs before and after each candidate neighbour
+        # in one batch and pick the cheaper position branchlessly
+        costs_matrix = cost_evaluator.get_distance_matrix()
+        num_neighbours = len(neighbours)
+        neighbour_ids = np.fromiter(
+            (n.node_id for n in neighbours), dtype=np.intp, count=num_neighbours)
+        predecessor_ids = np.fromiter(
+            (solution.prev(n).node_id for n in neighbours), dtype=np.intp, count=num_neighbours)
+        successor_ids = np.fromiter(
+            (solution.next(n).node_id for n in neighbours), dtype=np.intp, count=num_neighbours)
+
+        node_id = node_to_move.node_id
+        insertion_costs_before = (
+                costs_matrix[node_id, predecessor_ids]
+                + costs_matrix[node_id, neighbour_ids]
+                - costs_matrix[predecessor_ids, neighbour_ids]
+        )
+        insertion_costs_after = (
+                costs_matrix[node_id, successor_ids]
+                + costs_matrix[node_id, neighbour_ids]
+                - costs_matrix[successor_ids, neighbour_ids]
+        )
+        insertion_costs = np.minimum(insertion_costs_before, insertion_costs_after)
+        insert_before_neighbour = insertion_costs_before <= insertion_costs_after
+
+        for index, neighbour in enumerate(neighbours):
+            if insert_before_neighbour[index]:
+                insert_after = solution.prev(neighbour)
+                insert_before = neighbour
+            else:
+                insert_after = neighbour
+                insert_before = solution.next(neighbour)
 
-        if to_route != from_route and neighbour not in cur_chain.relocated_nodes:
             insertion = insert_node(
                 node_to_move=node_to_move,
                 removal_gain=removal_improvement,
                 insert_next_to=neighbour,
+                insertion_cost=int(insertion_costs[index]),
+                insert_after=insert_after,
+                insert_before=insert_before,
                 cur_chain=cur_chain,
-                solution=solution,
-                cost_evaluator=cost_evaluator
+                solution=solution
             )
             if insertion:
-                candidate_insertions[to_route].append(
+                candidate_insertions[solution.route_of(neighbour)].append(
                     insertion
                 )
 
     # TODO this can also be pre-processed
     for destination_route, insertions in candidate_insertions.items():
-        best_insertion = sorted(insertions)[0]
+        # only the best insertion is needed, so avoid a full sort
+        best_insertion = min(insertions)
         extended_chain = cur_chain.extend(best_insertion)
 
         # Check feasibility of the target route after insertion
@@ -256,4 +275,5 @@ def search_relocation_chains(
             node_to_move=start_node,
             max_depth=max_depth
         )
-    return sorted(found_moves)
+    found_moves.sort(key=lambda move: -move.improvement)
+    return found_moves
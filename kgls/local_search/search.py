@@ -96,7 +96,7 @@ def find_best_improving_moves(
 
         # execute the moves
         for move in disjunct_moves:
-            changed_routes = changed_routes | move.get_routes()
+            changed_routes.update(move.get_routes())
             old_costs = cost_evaluator.get_solution_costs(solution)
 
             move.execute(solution)
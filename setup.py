@@ -4,5 +4,5 @@ setup(
     name="my_package",
     version="0.1.0",
     packages=find_packages(),
-    install_requires=[],  # Add dependencies here
+    install_requires=["numpy"],
 )
\ No newline at end of file
@@ -1,5 +1,5 @@
 
-from kgls.local_search.operator_cross_exchange import search_cross_exchanges_from
+from kgls.local_search.operator_cross_exchange import search_cross_exchanges, search_cross_exchanges_from
 from kgls.datastructure import Node, VRPProblem, CostEvaluator, VRPSolution
 
 
@@ -107,3 +107,44 @@ def test_search_cross_exchanges_from():
     assert best_move.improvement == 171
     assert best_move.segment1 == [problem.nodes[3], problem.nodes[2]]
     assert best_move.segment2 == [problem.nodes[4]]
+
+
+def test_search_cross_exchanges_matches_python_search():
+    problem, evaluator = build_problem()
+
+    route1 = [
+        problem.nodes[1],
+        problem.nodes[4],
+        problem.nodes[3],
+    ]
+    route2 = [
+        problem.nodes[2],
+        problem.nodes[5],
+    ]
+    solution = VRPSolution(problem)
+    solution.add_route(route1)
+    solution.add_route(route2)
+
+    start_nodes = [node for node in problem.customers]
+    found_moves = search_cross_exchanges(
+        solution=solution,
+        cost_evaluator=evaluator,
+        start_nodes=start_nodes
+    )
+
+    expected_moves = []
+    for start_node in start_nodes:
+        expected_moves.extend(
+            search_cross_exchanges_from(solution, evaluator, start_node)
+        )
+
+    def move_key(move):
+        return (
+            move.improvement,
+            [node.node_id for node in move.segment1],
+            [node.node_id for node in move.segment2],
+            move.segment1_insert_after.node_id,
+            move.segment2_insert_after.node_id,
+        )
+
+    assert sorted(map(move_key, found_moves)) == sorted(map(move_key, expected_moves))